@@ -1,6 +1,6 @@
 """Conll labels convertation"""
 
-from typing import List, Tuple
+from typing import List, Tuple, Iterable
 from pathlib import Path
 import argparse
 import json
@@ -58,7 +58,8 @@ def iob_to_bio(labels: List[str]) -> List[str]:
     return result
 
 
-def load_conll(src_path: str) -> List[Tuple[List[str], List[str]]]:
+def load_conll(src_path: str,
+               label_column: int = -1) -> List[Tuple[List[str], List[str]]]:
     sentences = []
     with open(src_path, 'rt') as file:
         tokens: List[str] = []
@@ -71,14 +72,77 @@ def load_conll(src_path: str) -> List[Tuple[List[str], List[str]]]:
                     sentences.append((tokens, labels))
                     tokens, labels = [], []
                 continue
-            token, *items = s.split()
-            tokens.append(token)
-            labels.append(items[-1])
+            features = s.split()
+            tokens.append(features[0])
+            labels.append(features[label_column])
         if tokens:
             sentences.append((tokens, labels))
     return sentences
 
 
+def load_conll_columns(
+        src_path: str, label_column: int = -1
+) -> List[Tuple[str, List[List[str]], List[str]]]:
+    """Loads CONLL file keeping document names and all columns
+
+    :param src_path: path to CONLL file
+    :type src_path: str
+    :param label_column: index of label column, defaults to -1
+    :type label_column: int, optional
+    :return: document name, token columns except label and labels
+             for every sentence
+    :rtype: List[Tuple[str, List[List[str]], List[str]]]
+    """
+    sentences = []
+    with open(src_path, 'rt') as file:
+        document = ''
+        rows: List[List[str]] = []
+        labels: List[str] = []
+        for s in file:
+            if s.startswith('-DOCSTART-') or not s.strip():
+                if rows:
+                    sentences.append((document, rows, labels))
+                    rows, labels = [], []
+                if s.startswith('-DOCSTART-'):
+                    fields = s.split()
+                    document = fields[1] if len(fields) > 1 else ''
+                continue
+            features = s.split()
+            labels.append(features.pop(label_column))
+            rows.append(features)
+        if rows:
+            sentences.append((document, rows, labels))
+    return sentences
+
+
+def merge_columns(
+        pred: Iterable[Tuple[List[str], List[str]]],
+        etalon: Iterable[Tuple[str, List[List[str]], List[str]]]
+) -> Iterable[str]:
+    """Builds lines of evaluation file (etalon columns, etalon label,
+    predicted label) keeping "-DOCSTART-" lines of etalon
+
+    :param pred: predicted tokens and labels
+    :type pred: Iterable[Tuple[List[str], List[str]]]
+    :param etalon: sentences loaded by load_conll_columns
+    :type etalon: Iterable[Tuple[str, List[List[str]], List[str]]]
+    :yield: lines of evaluation file
+    :rtype: Iterable[str]
+    """
+    document = ''
+    for (tp, lp), (doc, rows, lg) in zip(pred, etalon):
+        assert tp == [row[0] for row in rows]
+        width = len(rows[0]) + 2
+        if doc != document and width >= 4:
+            yield ' '.join(['-DOCSTART-', doc] + ['-X-'] * (width - 4) +
+                           ['O', 'O'])
+            yield ''
+        document = doc
+        for row, g, p in zip(rows, lg, lp):
+            yield ' '.join(row + [g, p])
+        yield ''
+
+
 def load_predictions(src_path: str) -> List[Tuple[List[str], List[str]]]:
     predictions = []
     with open(src_path, 'rt') as file:
@@ -97,15 +161,27 @@ if __name__ == '__main__':
     parser.add_argument('--etalon', '-e', required=True)
     parser.add_argument('--output', '-o', required=True)
     parser.add_argument('--bio', '-b', action='store_true')
+    parser.add_argument('--label_column', '-l', type=int, default=-1)
+    parser.add_argument('--keep_columns', '-k', action='store_true')
     args = parser.parse_args()
     pred = load_predictions(args.predict)
     label_postprocessing = iob_to_bio if args.bio else lambda x: x
     iob_pred = map(lambda s: (s[0], label_postprocessing(bilou_to_iob(s[1]))),
                    pred)
-    etalon = load_conll(args.etalon)
-    iob_etalon = map(lambda s: (s[0], label_postprocessing(s[1])), etalon)
     with open(args.output, 'wt') as out_file:
-        for (tp, lp), (tg, lg) in zip(iob_pred, iob_etalon):
-            assert tp == tg
-            out_file.writelines([' '.join(p) + '\n' for p in zip(tp, lg, lp)])
-            out_file.write('\n')
+        if args.keep_columns:
+            etalon_columns = load_conll_columns(args.etalon, args.label_column)
+            iob_etalon_columns = map(
+                lambda s: (s[0], s[1], label_postprocessing(s[2])),
+                etalon_columns)
+            out_file.writelines(
+                s + '\n' for s in merge_columns(iob_pred, iob_etalon_columns))
+        else:
+            etalon = load_conll(args.etalon, args.label_column)
+            iob_etalon = map(lambda s: (s[0], label_postprocessing(s[1])),
+                             etalon)
+            for (tp, lp), (tg, lg) in zip(iob_pred, iob_etalon):
+                assert tp == tg
+                out_file.writelines(
+                    [' '.join(p) + '\n' for p in zip(tp, lg, lp)])
+                out_file.write('\n')
@@ -8,6 +8,7 @@
 # - option to set boundary (-b argument)
 # - LaTeX output (-l argument) not supported
 # - raw tags (-r argument) not supported
+# - -DOCSTART- lines are sentence boundaries, not tokens
 
 import sys
 import re
@@ -15,11 +16,13 @@ import re
 from collections import defaultdict, namedtuple
 
 ANY_SPACE = '<SPACE>'
+DOCSTART = '-DOCSTART-'
 
 class FormatError(Exception):
     pass
 
 Metrics = namedtuple('Metrics', 'tp fp fn prec rec fscore')
+Span = namedtuple('Span', 'start end type')
 
 class EvalCounts(object):
     def __init__(self):
@@ -47,6 +50,10 @@ def parse_args(argv):
         help='character delimiting items in input')
     arg('-o', '--otag', metavar='CHAR', default='O',
         help='alternative outside tag')
+    arg('-e', '--errors', metavar='PATH', default=None,
+        help='write span errors to SQLite database')
+    arg('--offsets', metavar='COL', nargs=2, type=int, default=None,
+        help='token start and end offset columns stored with span errors')
     arg('file', nargs='?', default=None)
     return parser.parse_args(argv)
 
@@ -74,7 +81,10 @@ def evaluate(iterable, options=None):
         else:
             features = line.split(options.delimiter)
 
-        if num_features is None:
+        if len(features) != 0 and features[0] == DOCSTART:
+            features = []
+
+        if num_features is None and len(features) != 0:
             num_features = len(features)
         elif num_features != len(features) and len(features) != 0:
             raise FormatError('unexpected number of features: %d (%d)' %
@@ -231,14 +241,37 @@ def start_of_chunk(prev_tag, tag, prev_type, type_):
 
     return chunk_start
 
+def extract_spans(tags):
+    # extract chunks of a sentence as spans of token positions
+    # (end is exclusive) using the same rules as evaluate
+    spans = []
+    start = None
+    last_tag, last_type = 'O', ''
+    for index, label in enumerate(tags + ['O']):
+        tag, type_ = parse_tag(label)
+        if start is not None and end_of_chunk(last_tag, tag, last_type, type_):
+            spans.append(Span(start, index, last_type))
+            start = None
+        if start_of_chunk(last_tag, tag, last_type, type_):
+            start = index
+        last_tag, last_type = tag, type_
+    return spans
+
 def main(argv):
     args = parse_args(argv[1:])
 
+    if args.errors is None:
+        evaluate_file = evaluate
+    else:
+        from slonlp.utils.error_analysis import evaluate_with_errors
+        evaluate_file = lambda f, o: evaluate_with_errors(
+            f, args.errors, o, offset_columns=args.offsets)
+
     if args.file is None:
-        counts = evaluate(sys.stdin, args)
+        counts = evaluate_file(sys.stdin, args)
     else:
         with open(args.file) as f:
-            counts = evaluate(f, args)
+            counts = evaluate_file(f, args)
     report(counts)
 
 if __name__ == '__main__':
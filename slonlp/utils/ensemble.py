@@ -0,0 +1,214 @@
+"""Span level voting over predictions of several taggers"""
+
+from typing import List, Tuple, Dict, Optional, Sequence
+from pathlib import Path
+from collections import defaultdict
+from contextlib import ExitStack
+from itertools import zip_longest
+from glob import glob
+from functools import partial
+from multiprocessing import Pool
+import argparse
+import json
+
+import tqdm
+
+from slonlp.utils.bilou_to_iob import bilou_to_iob, iob_to_bio
+from slonlp.utils.conlleval import Span, extract_spans
+
+
+def parse_prediction(sent: str) -> Tuple[List[str], List[str]]:
+    """Parses line of predictions file in the format of load_predictions
+
+    :param sent: JSON line with sentence predictions
+    :type sent: str
+    :return: sentence words and tags
+    :rtype: Tuple[List[str], List[str]]
+    """
+    sentence_preds = json.loads(sent)
+    return sentence_preds["words"], sentence_preds["tags"]
+
+
+def vote_spans(
+    predictions: Sequence[List[Span]],
+    weights: Sequence[float],
+    min_score: Optional[float] = None,
+) -> List[Span]:
+    """Selects spans by weighted voting of models. Span gets the weights of
+    models which predicted exactly it. Overlapping spans are resolved in
+    favor of higher score and then longer span.
+
+    :param predictions: spans predicted by every model
+    :type predictions: Sequence[List[Span]]
+    :param weights: weight of every model
+    :type weights: Sequence[float]
+    :param min_score: score span should exceed to be selected,
+                      defaults to None (half of the total weight)
+    :type min_score: Optional[float], optional
+    :return: selected spans ordered by position
+    :rtype: List[Span]
+    """
+    if min_score is None:
+        min_score = sum(weights) / 2
+    scores: Dict[Span, float] = defaultdict(float)
+    for spans, weight in zip(predictions, weights):
+        for span in set(spans):
+            scores[span] += weight
+    candidates = sorted(
+        (span for span, score in scores.items() if score > min_score),
+        key=lambda s: (-scores[s], s.start - s.end, s.start),
+    )
+    selected: List[Span] = []
+    for span in candidates:
+        if all(span.end <= s.start or s.end <= span.start for s in selected):
+            selected.append(span)
+    return sorted(selected)
+
+
+def spans_to_iob(spans: List[Span], length: int) -> List[str]:
+    """Builds IOB label sequence from non overlapping spans
+
+    :param spans: spans ordered by position
+    :type spans: List[Span]
+    :param length: number of tokens
+    :type length: int
+    :return: label sequence in IOB format
+    :rtype: List[str]
+    """
+    labels = ["O"] * length
+    last = None
+    for span in spans:
+        for index in range(span.start, span.end):
+            labels[index] = "I-" + span.type
+        if last and last.end == span.start and last.type == span.type:
+            labels[span.start] = "B-" + span.type
+        last = span
+    return labels
+
+
+def combine_predictions(
+    src_paths: Sequence[Path],
+    output_path: Path,
+    weights: Optional[Sequence[float]] = None,
+    min_score: Optional[float] = None,
+    bio: bool = False,
+):
+    """Combines predictions files of several models to one CONLL file.
+    Files are read in lockstep, one sentence at a time.
+
+    :param src_paths: paths to predictions files in BILOU format
+    :type src_paths: Sequence[Path]
+    :param output_path: path to output CONLL file
+    :type output_path: Path
+    :param weights: weight of every model, defaults to None (equal weights)
+    :type weights: Optional[Sequence[float]], optional
+    :param min_score: score span should exceed to be selected,
+                      defaults to None (half of the total weight)
+    :type min_score: Optional[float], optional
+    :param bio: write labels in BIO format instead of IOB, defaults to False
+    :type bio: bool, optional
+    """
+    if weights is None:
+        weights = [1.0] * len(src_paths)
+    assert len(weights) == len(src_paths), "Number of weights doesn't match"
+    label_postprocessing = iob_to_bio if bio else lambda x: x
+    with ExitStack() as stack:
+        out_file = stack.enter_context(output_path.open("wt"))
+        files = [stack.enter_context(p.open("rt")) for p in src_paths]
+        for index, lines in enumerate(zip_longest(*files)):
+            assert all(lines), f"Numbers of sentences differ in {output_path}"
+            sentences = [parse_prediction(s) for s in lines]
+            words = sentences[0][0]
+            assert all(
+                w == words for w, _ in sentences
+            ), f"Words of sentence {index} don't match in {output_path}"
+            spans = vote_spans(
+                [extract_spans(bilou_to_iob(tags)) for _, tags in sentences],
+                weights,
+                min_score,
+            )
+            labels = label_postprocessing(spans_to_iob(spans, len(words)))
+            out_file.writelines(w + "\t" + l + "\n" for w, l in zip(words, labels))
+            out_file.write("\n")
+
+
+def combine_shards(
+    shards: Sequence[Tuple[Sequence[Path], Path]],
+    weights: Optional[Sequence[float]] = None,
+    min_score: Optional[float] = None,
+    bio: bool = False,
+    jobs: Optional[int] = None,
+):
+    """Combines predictions shard by shard in process pool
+
+    :param shards: paths to predictions files of every model and output path
+                   for every shard
+    :type shards: Sequence[Tuple[Sequence[Path], Path]]
+    :param weights: weight of every model, defaults to None (equal weights)
+    :type weights: Optional[Sequence[float]], optional
+    :param min_score: score span should exceed to be selected,
+                      defaults to None (half of the total weight)
+    :type min_score: Optional[float], optional
+    :param bio: write labels in BIO format instead of IOB, defaults to False
+    :type bio: bool, optional
+    :param jobs: number of processes, defaults to None (number of CPUs)
+    :type jobs: Optional[int], optional
+    """
+    combine = partial(
+        _combine_shard, weights=weights, min_score=min_score, bio=bio
+    )
+    with Pool(jobs) as pool:
+        for _ in tqdm.tqdm(pool.imap_unordered(combine, shards), total=len(shards)):
+            pass
+
+
+def _combine_shard(shard: Tuple[Sequence[Path], Path], **kwargs):
+    src_paths, output_path = shard
+    combine_predictions(src_paths, output_path, **kwargs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        "python ensemble -p <model 1 predictions> -p <model 2 predictions> ... "
+        "-o <output path>"
+    )
+    parser.add_argument(
+        "--predict",
+        "-p",
+        action="append",
+        required=True,
+        help="predictions file or glob pattern of shards, once per model",
+    )
+    parser.add_argument("--output_path", "-o", required=True)
+    parser.add_argument("--weights", "-w", nargs="+", type=float, default=None)
+    parser.add_argument("--min_score", "-m", type=float, default=None)
+    parser.add_argument("--jobs", "-j", type=int, default=None)
+    parser.add_argument("--bio", "-b", action="store_true")
+    args = parser.parse_args()
+    model_paths = [
+        [Path(path) for path in sorted(glob(p))] for p in args.predict
+    ]
+    for pattern, paths in zip(args.predict, model_paths):
+        if not paths:
+            parser.error(f'no predictions files match "{pattern}"')
+    assert len(set(map(len, model_paths))) == 1, "Numbers of shards differ"
+    output_path = Path(args.output_path)
+    if output_path.is_dir():
+        shards = [
+            (paths, (output_path / paths[0].name).with_suffix(".txt"))
+            for paths in zip(*model_paths)
+        ]
+        combine_shards(shards, args.weights, args.min_score, args.bio, args.jobs)
+    elif output_path.parent.is_dir() and len(model_paths[0]) == 1:
+        combine_predictions(
+            [paths[0] for paths in model_paths],
+            output_path,
+            args.weights,
+            args.min_score,
+            args.bio,
+        )
+    else:
+        print(
+            "Error: output path should be path to existing directory or, "
+            "for single files, to file in existing directory"
+        )
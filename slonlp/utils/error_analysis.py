@@ -0,0 +1,390 @@
+"""Span level error analysis of tagging results"""
+
+from typing import List, Tuple, Iterable, Dict, Optional, Callable
+from pathlib import Path
+from collections import namedtuple, defaultdict
+import argparse
+import sqlite3
+
+from slonlp.utils.conlleval import (
+    ANY_SPACE,
+    DOCSTART,
+    EvalCounts,
+    evaluate,
+    Span,
+    extract_spans,
+    parse_args,
+    report,
+)
+
+SpanError = namedtuple(
+    "SpanError",
+    "kind gold pred document sentence line_start line_end "
+    "offset_start offset_end text",
+)
+
+# span error kinds
+BOUNDARY = "boundary"
+TYPE = "type"
+BOUNDARY_TYPE = "boundary+type"
+MISSED = "missed"
+SPURIOUS = "spurious"
+
+OUTSIDE = "O"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS errors (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    gold_type TEXT,
+    pred_type TEXT,
+    gold_start INTEGER,
+    gold_end INTEGER,
+    pred_start INTEGER,
+    pred_end INTEGER,
+    document TEXT,
+    sentence INTEGER NOT NULL,
+    line_start INTEGER NOT NULL,
+    line_end INTEGER NOT NULL,
+    offset_start INTEGER,
+    offset_end INTEGER,
+    text TEXT
+);
+CREATE TABLE IF NOT EXISTS confusion (
+    gold_type TEXT NOT NULL,
+    pred_type TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (gold_type, pred_type)
+);
+"""
+
+INDICES = """
+CREATE INDEX IF NOT EXISTS errors_kind ON errors (kind);
+CREATE INDEX IF NOT EXISTS errors_gold_type ON errors (gold_type, pred_type);
+CREATE INDEX IF NOT EXISTS errors_pred_type ON errors (pred_type);
+CREATE INDEX IF NOT EXISTS errors_document ON errors (document, sentence);
+"""
+
+
+def classify_errors(
+    gold: List[Span], pred: List[Span]
+) -> Iterable[Tuple[str, Optional[Span], Optional[Span]]]:
+    """Matches gold and predicted spans of sentence and classifies mismatches.
+    Overlapping gold and predicted spans which are not matched exactly are
+    paired in order of decreasing overlap.
+
+    :param gold: gold spans
+    :type gold: List[Span]
+    :param pred: predicted spans
+    :type pred: List[Span]
+    :yield: error kind, gold span and predicted span (None if absent)
+    :rtype: Iterable[Tuple[str, Optional[Span], Optional[Span]]]
+    """
+    exact = set(gold) & set(pred)
+    free_gold = [g for g in gold if g not in exact]
+    free_pred = [p for p in pred if p not in exact]
+    overlaps = sorted(
+        (
+            (min(g.end, p.end) - max(g.start, p.start), i, j)
+            for i, g in enumerate(free_gold)
+            for j, p in enumerate(free_pred)
+            if p.start < g.end and g.start < p.end
+        ),
+        key=lambda o: (-o[0], o[1], o[2]),
+    )
+    pairs: Dict[int, int] = {}
+    paired_pred = set()
+    for _, i, j in overlaps:
+        if i not in pairs and j not in paired_pred:
+            pairs[i] = j
+            paired_pred.add(j)
+    for i, g in enumerate(free_gold):
+        if i not in pairs:
+            yield MISSED, g, None
+            continue
+        p = free_pred[pairs[i]]
+        if (p.start, p.end) == (g.start, g.end):
+            yield TYPE, g, p
+        elif p.type == g.type:
+            yield BOUNDARY, g, p
+        else:
+            yield BOUNDARY_TYPE, g, p
+    for j, p in enumerate(free_pred):
+        if j not in paired_pred:
+            yield SPURIOUS, None, p
+
+
+class ErrorCollector(object):
+    """Collects span errors and type confusion matrix sentence by sentence
+    while lines of tagging results are being passed to conlleval
+
+    :param options: conlleval options
+    :param sink: receives batches of span errors
+    :type sink: Callable[[List[SpanError]], None]
+    :param offset_columns: indices of token start and end offset columns
+                           if present, defaults to None
+    :type offset_columns: Optional[Tuple[int, int]], optional
+    :param batch_size: number of errors passed to sink at once,
+                       defaults to 10000
+    :type batch_size: int, optional
+    """
+
+    def __init__(
+        self,
+        options,
+        sink: Callable[[List[SpanError]], None],
+        offset_columns: Optional[Tuple[int, int]] = None,
+        batch_size: int = 10000,
+    ):
+        self.options = options
+        self.sink = sink
+        self.offset_columns = offset_columns
+        self.batch_size = batch_size
+        self.confusion: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.document = ""
+        self.sentence = 0
+        self._rows: List[Tuple[int, List[str]]] = []
+        self._errors: List[SpanError] = []
+
+    def track(self, iterable: Iterable[str]) -> Iterable[str]:
+        """Passes lines through and collects errors from them.
+        "-DOCSTART-" lines set current document name.
+
+        :param iterable: lines of tagging results
+        :type iterable: Iterable[str]
+        :yield: the same lines
+        :rtype: Iterable[str]
+        """
+        for line_number, line in enumerate(iterable, 1):
+            yield line
+            stripped = line.rstrip("\r\n")
+            if self.options.delimiter == ANY_SPACE:
+                features = stripped.split()
+            else:
+                features = stripped.split(self.options.delimiter)
+            if not features or features[0] == self.options.boundary:
+                self._end_sentence()
+            elif features[0] == DOCSTART:
+                self._end_sentence()
+                self.document = features[1] if len(features) > 1 else ""
+                self.sentence = 0
+            else:
+                self._rows.append((line_number, features))
+        self._end_sentence()
+        if self._errors:
+            self.sink(self._errors)
+            self._errors = []
+
+    def _end_sentence(self):
+        if not self._rows:
+            return
+        self._errors.extend(self._sentence_errors(self._rows))
+        if len(self._errors) >= self.batch_size:
+            self.sink(self._errors)
+            self._errors = []
+        self.sentence += 1
+        self._rows = []
+
+    def _sentence_errors(
+        self, rows: List[Tuple[int, List[str]]]
+    ) -> Iterable[SpanError]:
+        gold = extract_spans([features[-2] for _, features in rows])
+        pred = extract_spans([features[-1] for _, features in rows])
+        for span in set(gold) & set(pred):
+            self.confusion[span.type, span.type] += 1
+        for kind, g, p in classify_errors(gold, pred):
+            if kind != BOUNDARY:
+                self.confusion[
+                    g.type if g else OUTSIDE, p.type if p else OUTSIDE
+                ] += 1
+            start = min(s.start for s in (g, p) if s)
+            end = max(s.end for s in (g, p) if s)
+            offset_start, offset_end = None, None
+            if self.offset_columns:
+                start_column, end_column = self.offset_columns
+                offset_start = int(rows[start][1][start_column])
+                offset_end = int(rows[end - 1][1][end_column])
+            yield SpanError(
+                kind,
+                g,
+                p,
+                self.document,
+                self.sentence,
+                rows[start][0],
+                rows[end - 1][0],
+                offset_start,
+                offset_end,
+                " ".join(features[0] for _, features in rows[start:end]),
+            )
+
+
+def write_errors(connection: sqlite3.Connection, errors: Iterable[SpanError]):
+    """Inserts span errors to error database
+
+    :param connection: error database connection
+    :type connection: sqlite3.Connection
+    :param errors: span errors
+    :type errors: Iterable[SpanError]
+    """
+    connection.executemany(
+        "INSERT INTO errors (kind, gold_type, pred_type, gold_start, gold_end, "
+        "pred_start, pred_end, document, sentence, line_start, line_end, "
+        "offset_start, offset_end, text) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            (
+                e.kind,
+                e.gold.type if e.gold else None,
+                e.pred.type if e.pred else None,
+                e.gold.start if e.gold else None,
+                e.gold.end if e.gold else None,
+                e.pred.start if e.pred else None,
+                e.pred.end if e.pred else None,
+                e.document,
+                e.sentence,
+                e.line_start,
+                e.line_end,
+                e.offset_start,
+                e.offset_end,
+                e.text,
+            )
+            for e in errors
+        ),
+    )
+
+
+def evaluate_with_errors(
+    iterable: Iterable[str],
+    db_path: Path,
+    options=None,
+    offset_columns: Optional[Tuple[int, int]] = None,
+    batch_size: int = 10000,
+) -> EvalCounts:
+    """Evaluates tagging results with conlleval and writes span errors and
+    type confusion matrix to SQLite database in the same pass.
+    To keep positions in the source documents, build tagging results with
+    "bilou_to_iob -k", it keeps "-DOCSTART-" lines and the etalon columns
+    (for brat_to_conll output "token start end gold predicted", use
+    offset_columns (1, 2)).
+
+    :param iterable: lines of tagging results (token, ..., gold, predicted)
+    :type iterable: Iterable[str]
+    :param db_path: path to error database, existing tables are replaced
+    :type db_path: Path
+    :param options: conlleval options, defaults to None
+    :param offset_columns: indices of token start and end offset columns,
+                           defaults to None
+    :type offset_columns: Optional[Tuple[int, int]], optional
+    :param batch_size: number of errors inserted at once, defaults to 10000
+    :type batch_size: int, optional
+    :return: conlleval counts
+    :rtype: EvalCounts
+    """
+    if options is None:
+        options = parse_args([])
+
+    connection = sqlite3.connect(str(db_path))
+    try:
+        connection.executescript(
+            "DROP TABLE IF EXISTS errors; DROP TABLE IF EXISTS confusion;" + SCHEMA
+        )
+        collector = ErrorCollector(
+            options,
+            lambda errors: write_errors(connection, errors),
+            offset_columns,
+            batch_size,
+        )
+        counts = evaluate(collector.track(iterable), options)
+        connection.executemany(
+            "INSERT INTO confusion VALUES (?, ?, ?)",
+            ((g, p, c) for (g, p), c in collector.confusion.items()),
+        )
+        connection.executescript(INDICES)
+        connection.commit()
+    finally:
+        connection.close()
+    return counts
+
+
+def query_errors(
+    db_path: Path,
+    kind: Optional[str] = None,
+    gold_type: Optional[str] = None,
+    pred_type: Optional[str] = None,
+    document: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> List[sqlite3.Row]:
+    """Selects span errors from error database
+
+    :param db_path: path to error database
+    :type db_path: Path
+    :param kind: error kind, defaults to None
+    :type kind: Optional[str], optional
+    :param gold_type: gold span type, defaults to None
+    :type gold_type: Optional[str], optional
+    :param pred_type: predicted span type, defaults to None
+    :type pred_type: Optional[str], optional
+    :param document: document name, defaults to None
+    :type document: Optional[str], optional
+    :param limit: maximal number of errors, defaults to None
+    :type limit: Optional[int], optional
+    :return: span errors ordered by position
+    :rtype: List[sqlite3.Row]
+    """
+    conditions = [
+        (column, value)
+        for column, value in (
+            ("kind", kind),
+            ("gold_type", gold_type),
+            ("pred_type", pred_type),
+            ("document", document),
+        )
+        if value is not None
+    ]
+    query = "SELECT * FROM errors"
+    if conditions:
+        query += " WHERE " + " AND ".join(f"{c} = ?" for c, _ in conditions)
+    query += " ORDER BY id"
+    if limit is not None:
+        query += f" LIMIT {int(limit)}"
+    connection = sqlite3.connect(str(db_path))
+    connection.row_factory = sqlite3.Row
+    try:
+        return connection.execute(query, [v for _, v in conditions]).fetchall()
+    finally:
+        connection.close()
+
+
+def load_confusion(db_path: Path) -> Dict[Tuple[str, str], int]:
+    """Loads span type confusion matrix from error database. Diagonal counts
+    exactly matched spans, "O" stands for absent span. Boundary errors of
+    the same type are not counted, they are available in errors table.
+
+    :param db_path: path to error database
+    :type db_path: Path
+    :return: number of spans by gold and predicted type
+    :rtype: Dict[Tuple[str, str], int]
+    """
+    connection = sqlite3.connect(str(db_path))
+    try:
+        return {
+            (g, p): c
+            for g, p, c in connection.execute("SELECT * FROM confusion")
+        }
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        "python error_analysis -i <tagging results> -o <error database>"
+    )
+    parser.add_argument("--input_path", "-i", required=True)
+    parser.add_argument("--output_path", "-o", required=True)
+    parser.add_argument("--offsets", nargs=2, type=int, default=None)
+    args = parser.parse_args()
+    with open(args.input_path) as file:
+        counts = evaluate_with_errors(
+            file, Path(args.output_path), offset_columns=args.offsets
+        )
+    report(counts)
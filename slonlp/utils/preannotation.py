@@ -0,0 +1,287 @@
+"""Dictionary and regex based pre-annotation of texts in brat format"""
+
+from typing import List, Tuple, Iterable, Dict, Optional, Pattern, Sequence
+from pathlib import Path
+from bisect import bisect
+from multiprocessing import Pool
+import argparse
+import re
+
+import tqdm
+
+from slonlp.utils.brat_to_conll import Entity, Position
+from slonlp.utils.tokenization import (
+    tokenize_text,
+    get_sentence_tokenizer,
+    get_word_tokenizer,
+)
+
+
+def normalize_token(token: str) -> str:
+    """Normalizes token for dictionary lookup
+
+    :param token: token text
+    :type token: str
+    :return: normalized token
+    :rtype: str
+    """
+    return token.lower().replace("ё", "е")
+
+
+class AhoCorasick(object):
+    """Aho-Corasick automaton over token sequences. Finds all occurrences
+    of dictionary entries in one pass over tokens.
+    """
+
+    def __init__(self):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        # entry length and label for states finishing entry
+        self.output: List[Optional[Tuple[int, str]]] = [None]
+        # nearest state finishing entry reachable by fail links
+        self.output_link: List[int] = [0]
+
+    def add(self, tokens: Sequence[str], label: str):
+        """Adds dictionary entry. The first label of repeated entry is kept.
+
+        :param tokens: normalized entry tokens
+        :type tokens: Sequence[str]
+        :param label: entity label
+        :type label: str
+        """
+        if not tokens:
+            return
+        state = 0
+        for token in tokens:
+            next_state = self.goto[state].get(token)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(None)
+                self.output_link.append(0)
+                self.goto[state][token] = next_state
+            state = next_state
+        if self.output[state] is None:
+            self.output[state] = (len(tokens), label)
+
+    def build(self):
+        """Computes fail links, should be called after all entries are added"""
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for token, child in self.goto[state].items():
+                queue.append(child)
+                fail = self.fail[state]
+                while fail and token not in self.goto[fail]:
+                    fail = self.fail[fail]
+                fail = self.goto[fail].get(token, 0)
+                self.fail[child] = fail
+                self.output_link[child] = (
+                    fail if self.output[fail] else self.output_link[fail]
+                )
+
+    def iter_matches(self, tokens: Iterable[str]) -> Iterable[Tuple[int, int, str]]:
+        """Finds all dictionary entries in token sequence
+
+        :param tokens: normalized tokens
+        :type tokens: Iterable[str]
+        :yield: start and end (exclusive) token indices and label
+        :rtype: Iterable[Tuple[int, int, str]]
+        """
+        state = 0
+        for index, token in enumerate(tokens):
+            while state and token not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(token, 0)
+            match = state if self.output[state] else self.output_link[state]
+            while match:
+                length, label = self.output[match]
+                yield index + 1 - length, index + 1, label
+                match = self.output_link[match]
+
+
+def load_gazetteer(path: Path, automaton: AhoCorasick):
+    """Adds entries of gazetteer file to automaton. Every line of the file
+    contains label and entry text separated by tab.
+
+    :param path: path to gazetteer file
+    :type path: Path
+    :param automaton: automaton to add entries to
+    :type automaton: AhoCorasick
+    """
+    word_tokenizer = get_word_tokenizer()
+    for label, phrase in _read_labeled_lines(path):
+        tokens = [
+            normalize_token(phrase[start:end])
+            for start, end in word_tokenizer.span_tokenize(phrase)
+        ]
+        automaton.add(tokens, label)
+
+
+def load_patterns(path: Path) -> List[Tuple[str, Pattern]]:
+    """Loads regular expressions file. Every line of the file contains
+    label and regular expression separated by tab.
+
+    :param path: path to regular expressions file
+    :type path: Path
+    :return: labels and compiled regular expressions
+    :rtype: List[Tuple[str, Pattern]]
+    """
+    return [
+        (label, re.compile(pattern)) for label, pattern in _read_labeled_lines(path)
+    ]
+
+
+def _read_labeled_lines(path: Path) -> Iterable[Tuple[str, str]]:
+    with path.open("rt") as file:
+        for line_number, s in enumerate(file, 1):
+            if not s.strip():
+                continue
+            fields = s.rstrip("\n").split("\t", 1)
+            if len(fields) != 2:
+                raise ValueError(
+                    f'Line {line_number} of "{path}" should contain label '
+                    "and text separated by tab"
+                )
+            yield fields[0], fields[1]
+
+
+def resolve_overlaps(
+    candidates: Iterable[Tuple[int, int, str]]
+) -> List[Tuple[int, int, str]]:
+    """Selects non overlapping spans, longer spans win, then earlier ones
+
+    :param candidates: start and end character positions and label
+    :type candidates: Iterable[Tuple[int, int, str]]
+    :return: selected spans ordered by position
+    :rtype: List[Tuple[int, int, str]]
+    """
+    selected: List[Tuple[int, int, str]] = []
+    for span in sorted(candidates, key=lambda c: (c[0] - c[1], c[0])):
+        start, end, _ = span
+        index = bisect(selected, span)
+        if index and selected[index - 1][1] > start:
+            continue
+        if index < len(selected) and selected[index][0] < end:
+            continue
+        selected.insert(index, span)
+    return selected
+
+
+def find_entities(
+    text: str,
+    sentences: Iterable[List[Tuple[int, int]]],
+    automaton: AhoCorasick,
+    patterns: Sequence[Tuple[str, Pattern]] = (),
+) -> List[Entity]:
+    """Finds dictionary entries and regular expression matches in text
+    splited by sentences and tokens. Entries don't cross sentence borders.
+
+    :param text: document text
+    :type text: str
+    :param sentences: list of sentence's token positions
+    :type sentences: Iterable[List[Tuple[int, int]]]
+    :param automaton: dictionary automaton
+    :type automaton: AhoCorasick
+    :param patterns: labels and regular expressions, defaults to ()
+    :type patterns: Sequence[Tuple[str, Pattern]], optional
+    :return: annotated text spans
+    :rtype: List[Entity]
+    """
+    candidates = []
+    for sent in sentences:
+        tokens = (normalize_token(text[start:end]) for start, end in sent)
+        for start, end, label in automaton.iter_matches(tokens):
+            candidates.append((sent[start][0], sent[end - 1][1], label))
+    for label, pattern in patterns:
+        for m in pattern.finditer(text):
+            if m.end() > m.start() and "\n" not in m.group():
+                candidates.append((m.start(), m.end(), label))
+    return [
+        Entity(f"T{i}", label, Position(start, end), text[start:end])
+        for i, (start, end, label) in enumerate(resolve_overlaps(candidates), 1)
+    ]
+
+
+def format_annotation(entities: Iterable[Entity]) -> Iterable[str]:
+    """Formats text spans as lines of brat "ann" file
+
+    :param entities: annotated text spans
+    :type entities: Iterable[Entity]
+    :yield: lines of "ann" file
+    :rtype: Iterable[str]
+    """
+    for e in entities:
+        yield f"{e.id}\t{e.label} {e.position.start} {e.position.end}\t{e.text}\n"
+
+
+_automaton: Optional[AhoCorasick] = None
+_patterns: Sequence[Tuple[str, Pattern]] = ()
+
+
+def _init_worker(automaton: AhoCorasick, patterns: Sequence[Tuple[str, Pattern]]):
+    global _automaton, _patterns
+    _automaton, _patterns = automaton, patterns
+
+
+def _preannotate_document(paths: Tuple[Path, Path]):
+    text_path, ann_path = paths
+    text = text_path.open("rt").read()
+    sentences = tokenize_text(get_sentence_tokenizer(), get_word_tokenizer(), text)
+    entities = find_entities(text, sentences, _automaton, _patterns)
+    ann_path.open("wt").writelines(format_annotation(entities))
+
+
+def preannotate_dir(
+    input_dir: Path,
+    output_dir: Path,
+    automaton: AhoCorasick,
+    patterns: Sequence[Tuple[str, Pattern]] = (),
+    jobs: Optional[int] = None,
+):
+    """Writes brat "ann" file for every "txt" file of directory.
+    Output directory is created if missing.
+
+    :param input_dir: path to directory with texts
+    :type input_dir: Path
+    :param output_dir: path to directory for annotations
+    :type output_dir: Path
+    :param automaton: dictionary automaton
+    :type automaton: AhoCorasick
+    :param patterns: labels and regular expressions, defaults to ()
+    :type patterns: Sequence[Tuple[str, Pattern]], optional
+    :param jobs: number of processes, defaults to None (number of CPUs)
+    :type jobs: Optional[int], optional
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    tasks = [
+        (text_path, (output_dir / text_path.name).with_suffix(".ann"))
+        for text_path in input_dir.glob("*.txt")
+    ]
+    with Pool(jobs, _init_worker, (automaton, patterns)) as pool:
+        for _ in tqdm.tqdm(
+            pool.imap_unordered(_preannotate_document, tasks, chunksize=16),
+            total=len(tasks),
+        ):
+            pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        "python preannotation -i <input dir> -o <output dir> -g <gazetteer> "
+        "[-r <regex file>]"
+    )
+    parser.add_argument("--input_dir", "-i", required=True)
+    parser.add_argument("--output_dir", "-o", required=True)
+    parser.add_argument("--gazetteer", "-g", action="append", default=[])
+    parser.add_argument("--regex", "-r", action="append", default=[])
+    parser.add_argument("--jobs", "-j", type=int, default=None)
+    args = parser.parse_args()
+    automaton = AhoCorasick()
+    for path in args.gazetteer:
+        load_gazetteer(Path(path), automaton)
+    automaton.build()
+    patterns = [p for path in args.regex for p in load_patterns(Path(path))]
+    preannotate_dir(
+        Path(args.input_dir), Path(args.output_dir), automaton, patterns, args.jobs
+    )
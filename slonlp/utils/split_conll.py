@@ -0,0 +1,232 @@
+"""Document-aware stratified train/dev/test split of CONLL file"""
+
+from typing import List, Tuple, Iterable, Dict, Sequence
+from pathlib import Path
+from collections import namedtuple, Counter
+import argparse
+import json
+import random
+from math import inf
+
+from slonlp.utils.conlleval import parse_tag, start_of_chunk
+
+DocumentStats = namedtuple("DocumentStats", "name line_count label_counts")
+
+SPLIT_NAMES = ("train", "dev", "test")
+
+
+def iterate_documents(conll: Iterable[str]) -> Iterable[Tuple[str, List[str]]]:
+    """Splits lines of CONLL file to documents by "-DOCSTART-" markers.
+    Lines before the first marker form a document with empty name.
+
+    :param conll: lines of CONLL file
+    :type conll: Iterable[str]
+    :yield: document name and document lines (including the marker)
+    :rtype: Iterable[Tuple[str, List[str]]]
+    """
+    name, lines = "", []
+    for s in conll:
+        if s.startswith("-DOCSTART-"):
+            if lines:
+                yield name, lines
+            fields = s.split()
+            name = fields[1] if len(fields) > 1 else ""
+            lines = []
+        lines.append(s)
+    if lines:
+        yield name, lines
+
+
+def count_labels(lines: Iterable[str], label_column: int = 1) -> Counter:
+    """Counts entities of every type in lines of CONLL document.
+    Any chunk coding scheme is accepted.
+
+    :param lines: lines of CONLL document
+    :type lines: Iterable[str]
+    :param label_column: index of label column, defaults to 1
+    :type label_column: int, optional
+    :return: number of entities by type
+    :rtype: Counter
+    """
+    counts: Counter = Counter()
+    last_tag, last_type = "O", ""
+    for s in lines:
+        features = s.split()
+        if not features or features[0] == "-DOCSTART-":
+            last_tag, last_type = "O", ""
+            continue
+        tag, type_ = parse_tag(features[label_column])
+        if start_of_chunk(last_tag, tag, last_type, type_):
+            counts[type_] += 1
+        last_tag, last_type = tag, type_
+    return counts
+
+
+def collect_document_stats(
+    src_path: Path, label_column: int = 1
+) -> List[DocumentStats]:
+    """Reads CONLL file once and computes label counts for every document.
+    Only one document is kept in memory at a time.
+
+    :param src_path: path to CONLL file
+    :type src_path: Path
+    :param label_column: index of label column, defaults to 1
+    :type label_column: int, optional
+    :return: statistics of documents in file order
+    :rtype: List[DocumentStats]
+    """
+    with src_path.open("rt") as file:
+        return [
+            DocumentStats(name, len(lines), count_labels(lines, label_column))
+            for name, lines in iterate_documents(file)
+        ]
+
+
+def stratify_documents(
+    stats: Sequence[DocumentStats], ratios: Sequence[float], seed: int = 0
+) -> List[int]:
+    """Assigns whole documents to splits keeping entity type distribution
+    of every split close to the distribution of the corpus (iterative
+    stratification). Documents with rare entity types are placed first.
+    Among splits needing the same number of document's entities the one
+    with the largest unfilled part of its size (in lines) is chosen, full
+    splits are skipped while there are others.
+
+    :param stats: documents statistics
+    :type stats: Sequence[DocumentStats]
+    :param ratios: desired part of corpus for every split
+    :type ratios: Sequence[float]
+    :param seed: random seed for tie breaking, defaults to 0
+    :type seed: int, optional
+    :return: split index for every document
+    :rtype: List[int]
+    """
+    total = sum(ratios)
+    ratios = [r / total for r in ratios]
+    label_totals: Counter = Counter()
+    for doc in stats:
+        label_totals.update(doc.label_counts)
+    label_needs = [
+        {label: ratio * count for label, count in label_totals.items()}
+        for ratio in ratios
+    ]
+    total_lines = sum(doc.line_count for doc in stats)
+    sizes = [ratio * total_lines for ratio in ratios]
+    line_needs = list(sizes)
+
+    order = list(range(len(stats)))
+    random.Random(seed).shuffle(order)
+    order.sort(
+        key=lambda i: (
+            min((label_totals[l] for l in stats[i].label_counts), default=inf),
+            -sum(stats[i].label_counts.values()),
+        )
+    )
+
+    assignment = [0] * len(stats)
+    for i in order:
+        counts = stats[i].label_counts
+        splits = [k for k, size in enumerate(sizes) if size > 0]
+        splits = [k for k in splits if line_needs[k] > 0] or splits
+        split = max(
+            splits,
+            key=lambda k: (
+                sum(min(label_needs[k][l], c) for l, c in counts.items()),
+                line_needs[k] / sizes[k],
+            ),
+        )
+        assignment[i] = split
+        line_needs[split] -= stats[i].line_count
+        for label, count in counts.items():
+            label_needs[split][label] -= count
+    return assignment
+
+
+def write_splits(src_path: Path, dst_paths: Sequence[Path], assignment: List[int]):
+    """Copies documents from CONLL file to split files in one pass
+
+    :param src_path: path to CONLL file
+    :type src_path: Path
+    :param dst_paths: paths to split files
+    :type dst_paths: Sequence[Path]
+    :param assignment: split index for every document
+    :type assignment: List[int]
+    """
+    files = [path.open("wt") for path in dst_paths]
+    try:
+        with src_path.open("rt") as src:
+            for split, (_, lines) in zip(assignment, iterate_documents(src)):
+                files[split].writelines(lines)
+    finally:
+        for file in files:
+            file.close()
+
+
+def split_conll(
+    src_path: Path,
+    output_dir: Path,
+    ratios: Sequence[float] = (0.8, 0.1, 0.1),
+    seed: int = 0,
+    label_column: int = 1,
+) -> Dict:
+    """Splits CONLL file with "-DOCSTART-" blocks to train, dev and test
+    files stratified by entity types and writes manifest of the split.
+    Output directory is created if missing.
+
+    :param src_path: path to CONLL file
+    :type src_path: Path
+    :param output_dir: path to directory for split files
+    :type output_dir: Path
+    :param ratios: parts of train, dev and test, defaults to (0.8, 0.1, 0.1)
+    :type ratios: Sequence[float], optional
+    :param seed: random seed, defaults to 0
+    :type seed: int, optional
+    :param label_column: index of label column, defaults to 1
+                         (layout of files written by brat_to_conll)
+    :type label_column: int, optional
+    :return: manifest
+    :rtype: Dict
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stats = collect_document_stats(src_path, label_column)
+    assignment = stratify_documents(stats, ratios, seed)
+    dst_paths = [(output_dir / name).with_suffix(".txt") for name in SPLIT_NAMES]
+    write_splits(src_path, dst_paths, assignment)
+
+    manifest: Dict = {"source": str(src_path), "seed": seed, "splits": {}}
+    for split, (name, path) in enumerate(zip(SPLIT_NAMES, dst_paths)):
+        docs = [doc for doc, k in zip(stats, assignment) if k == split]
+        label_counts: Counter = Counter()
+        for doc in docs:
+            label_counts.update(doc.label_counts)
+        manifest["splits"][name] = {
+            "path": str(path),
+            "ratio": ratios[split],
+            "documents": [doc.name for doc in docs],
+            "line_count": sum(doc.line_count for doc in docs),
+            "label_counts": dict(sorted(label_counts.items())),
+        }
+    with (output_dir / "manifest.json").open("wt") as file:
+        json.dump(manifest, file, ensure_ascii=False, indent=2)
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        "python split_conll -i <input conll> -o <output dir> [-r 0.8 0.1 0.1]"
+    )
+    parser.add_argument("--input_path", "-i", required=True)
+    parser.add_argument("--output_dir", "-o", required=True)
+    parser.add_argument(
+        "--ratios", "-r", nargs=3, type=float, default=[0.8, 0.1, 0.1]
+    )
+    parser.add_argument("--seed", "-s", type=int, default=0)
+    parser.add_argument("--label_column", "-l", type=int, default=1)
+    args = parser.parse_args()
+    split_conll(
+        Path(args.input_path),
+        Path(args.output_dir),
+        args.ratios,
+        args.seed,
+        args.label_column,
+    )
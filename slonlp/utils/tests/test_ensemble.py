@@ -0,0 +1,46 @@
+import json
+from pathlib import Path
+
+from slonlp.utils.conlleval import Span
+from slonlp.utils.ensemble import vote_spans, spans_to_iob, combine_predictions
+
+
+def test_vote_spans():
+    glove = [Span(0, 2, "PER"), Span(3, 4, "LOC")]
+    elmo = [Span(0, 2, "PER"), Span(3, 4, "ORG")]
+    bert = [Span(0, 1, "PER"), Span(3, 4, "ORG")]
+    assert vote_spans([glove, elmo, bert], [1, 1, 1]) == [
+        Span(0, 2, "PER"),
+        Span(3, 4, "ORG"),
+    ]
+    assert vote_spans([glove, elmo, bert], [3, 1, 1]) == [
+        Span(0, 2, "PER"),
+        Span(3, 4, "LOC"),
+    ]
+
+
+def test_spans_to_iob():
+    spans = [Span(0, 2, "PER"), Span(2, 3, "PER"), Span(4, 5, "LOC")]
+    assert spans_to_iob(spans, 6) == ["I-PER", "I-PER", "B-PER", "O", "I-LOC", "O"]
+
+
+def test_combine_predictions(tmpdir):
+    words = ["Иван", "Петров", "из", "Москвы"]
+    model_tags = [
+        ["B-PER", "L-PER", "O", "U-LOC"],
+        ["B-PER", "L-PER", "O", "U-ORG"],
+        ["U-PER", "O", "O", "U-LOC"],
+    ]
+    src_paths = []
+    for i, tags in enumerate(model_tags):
+        path = Path(tmpdir) / f"model{i}.json"
+        path.open("wt").writelines(
+            json.dumps({"words": words, "tags": tags}) + "\n" for _ in range(2)
+        )
+        src_paths.append(path)
+    output_path = Path(tmpdir) / "output.txt"
+
+    combine_predictions(src_paths, output_path)
+
+    sentence = ["Иван\tI-PER", "Петров\tI-PER", "из\tO", "Москвы\tI-LOC", ""]
+    assert output_path.open().read().splitlines() == sentence * 2
@@ -0,0 +1,114 @@
+from pathlib import Path
+
+from slonlp.utils.bilou_to_iob import load_conll_columns, merge_columns, bilou_to_iob
+from slonlp.utils.conlleval import Span, evaluate, extract_spans
+from slonlp.utils.error_analysis import (
+    classify_errors,
+    evaluate_with_errors,
+    query_errors,
+    load_confusion,
+)
+
+RESULTS = """-DOCSTART-\tdoc1\t-X-\t-X-
+Иван\t0\t4\tI-PER\tI-PER
+Петров\t5\t11\tI-PER\tO
+из\t12\t14\tO\tO
+Москвы\t15\t21\tI-LOC\tI-ORG
+
+Мэрия\t0\t5\tI-ORG\tI-ORG
+города\t6\t12\tO\tI-LOC
+""".splitlines(
+    keepends=True
+)
+
+
+def test_extract_spans():
+    tags = ["I-PER", "I-PER", "B-PER", "O", "I-LOC", "I-ORG"]
+    assert extract_spans(tags) == [
+        Span(0, 2, "PER"),
+        Span(2, 3, "PER"),
+        Span(4, 5, "LOC"),
+        Span(5, 6, "ORG"),
+    ]
+
+
+def test_classify_errors():
+    gold = [Span(0, 2, "PER"), Span(3, 4, "LOC"), Span(6, 7, "ORG")]
+    pred = [Span(0, 1, "PER"), Span(3, 4, "ORG"), Span(8, 9, "LOC")]
+    assert list(classify_errors(gold, pred)) == [
+        ("boundary", gold[0], pred[0]),
+        ("type", gold[1], pred[1]),
+        ("missed", gold[2], None),
+        ("spurious", None, pred[2]),
+    ]
+
+    gold = [Span(0, 2, "A"), Span(2, 5, "A")]
+    pred = [Span(1, 5, "A")]
+    assert list(classify_errors(gold, pred)) == [
+        ("missed", gold[0], None),
+        ("boundary", gold[1], pred[0]),
+    ]
+
+
+def test_evaluate_with_errors(tmpdir):
+    db_path = Path(tmpdir) / "errors.db"
+    counts = evaluate_with_errors(RESULTS, db_path, offset_columns=(1, 2))
+    expected = evaluate(RESULTS)
+    assert vars(counts) == vars(expected)
+
+    errors = query_errors(db_path)
+    assert [e["kind"] for e in errors] == ["boundary", "type", "spurious"]
+    boundary = errors[0]
+    assert boundary["document"] == "doc1"
+    assert (boundary["line_start"], boundary["line_end"]) == (2, 3)
+    assert (boundary["offset_start"], boundary["offset_end"]) == (0, 11)
+    assert boundary["text"] == "Иван Петров"
+    assert errors[2]["sentence"] == 1
+
+    assert [e["text"] for e in query_errors(db_path, gold_type="LOC")] == ["Москвы"]
+    assert load_confusion(db_path) == {
+        ("LOC", "ORG"): 1,
+        ("ORG", "ORG"): 1,
+        ("O", "LOC"): 1,
+    }
+
+
+def test_errors_of_brat_to_conll_documents(tmpdir):
+    etalon_path = Path(tmpdir) / "etalon.txt"
+    etalon_path.open("wt").writelines(
+        s + "\n"
+        for s in (
+            "-DOCSTART-\tdoc1\t-X-\t-X-",
+            "",
+            "Иван\tI-PER\t0\t4",
+            "из\tO\t5\t7",
+            "Москвы\tI-LOC\t8\t14",
+            "",
+            "-DOCSTART-\tdoc2\t-X-\t-X-",
+            "",
+            "Мэрия\tI-ORG\t0\t5",
+            "",
+        )
+    )
+    predictions = [
+        (["Иван", "из", "Москвы"], ["U-PER", "O", "O"]),
+        (["Мэрия"], ["U-LOC"]),
+    ]
+    iob_pred = [(words, bilou_to_iob(tags)) for words, tags in predictions]
+    lines = list(merge_columns(iob_pred, load_conll_columns(str(etalon_path), 1)))
+    db_path = Path(tmpdir) / "errors.db"
+
+    counts = evaluate_with_errors(lines, db_path, offset_columns=(1, 2))
+
+    assert lines[0].startswith("-DOCSTART- doc1")
+    assert vars(counts) == vars(evaluate(lines))
+    assert counts.token_counter == 4
+
+    errors = [
+        (e["kind"], e["document"], e["offset_start"], e["offset_end"], e["text"])
+        for e in query_errors(db_path)
+    ]
+    assert errors == [
+        ("missed", "doc1", 8, 14, "Москвы"),
+        ("type", "doc2", 0, 5, "Мэрия"),
+    ]
@@ -0,0 +1,98 @@
+import re
+import shutil
+from pathlib import Path
+
+import pytest
+
+from slonlp.utils.brat_to_conll import read_spans_annotation
+from slonlp.utils.preannotation import (
+    AhoCorasick,
+    load_gazetteer,
+    load_patterns,
+    preannotate_dir,
+    resolve_overlaps,
+    find_entities,
+    format_annotation,
+)
+
+
+def build_automaton(entries):
+    automaton = AhoCorasick()
+    for phrase, label in entries:
+        automaton.add(phrase.split(), label)
+    automaton.build()
+    return automaton
+
+
+def test_iter_matches():
+    automaton = build_automaton(
+        [("a b c", "X"), ("b c d", "Y"), ("c", "Z"), ("b c c", "W")]
+    )
+    matches = sorted(automaton.iter_matches("a b c d b c c".split()))
+    assert matches == [
+        (0, 3, "X"),
+        (1, 4, "Y"),
+        (2, 3, "Z"),
+        (4, 7, "W"),
+        (5, 6, "Z"),
+        (6, 7, "Z"),
+    ]
+
+
+def test_resolve_overlaps():
+    candidates = [(0, 5, "X"), (3, 10, "Y"), (10, 12, "Z"), (11, 12, "W")]
+    assert resolve_overlaps(candidates) == [(3, 10, "Y"), (10, 12, "Z")]
+
+
+def test_find_entities(tmpdir):
+    text = "Администрация города Москвы. Тел. 123-45-67"
+    sentences = [
+        [(m.start(), m.end()) for m in re.finditer(r"\w+|\S", text[:28])],
+        [(m.start() + 29, m.end() + 29) for m in re.finditer(r"\w+|\S", text[29:])],
+    ]
+    automaton = build_automaton(
+        [("администрация", "INST"), ("администрация города москвы", "INST"),
+         ("москвы . тел", "LOC"), ("москвы", "LOC")]
+    )
+    patterns = [("PHONE", re.compile(r"\d{3}-\d{2}-\d{2}"))]
+
+    entities = find_entities(text, sentences, automaton, patterns)
+
+    ann_path = Path(tmpdir) / "doc.ann"
+    ann_path.open("wt").writelines(format_annotation(entities))
+    assert read_spans_annotation(ann_path) == entities
+    assert [(e.label, e.text) for e in entities] == [
+        ("INST", "Администрация города Москвы"),
+        ("PHONE", "123-45-67"),
+    ]
+
+
+def test_load_gazetteer_format_error(tmpdir):
+    path = Path(tmpdir) / "gazetteer.txt"
+    path.open("wt").write("INST\tадминистрация\n\nкультура\n")
+    with pytest.raises(ValueError, match=r"Line 3 of .*gazetteer.txt"):
+        load_gazetteer(path, AhoCorasick())
+    with pytest.raises(ValueError, match=r"Line 3 of .*gazetteer.txt"):
+        load_patterns(path)
+
+
+def test_preannotate_dir(tmpdir):
+    brat_dir = Path(__file__).parent / "data"
+    brat_doc_name = "34339291023600645023003_2"
+    input_dir = Path(tmpdir) / "input"
+    input_dir.mkdir()
+    shutil.copy(str((brat_dir / brat_doc_name).with_suffix(".txt")), str(input_dir))
+    gazetteer_path = Path(tmpdir) / "gazetteer.txt"
+    gazetteer_path.open("wt").write("INST\tАдминистрация\nBIN\tразвитие культуры\n")
+    automaton = AhoCorasick()
+    load_gazetteer(gazetteer_path, automaton)
+    automaton.build()
+    output_dir = Path(tmpdir) / "output" / "ann"
+
+    preannotate_dir(input_dir, output_dir, automaton, jobs=1)
+
+    entities = read_spans_annotation((output_dir / brat_doc_name).with_suffix(".ann"))
+    assert {e.label for e in entities} == {"INST", "BIN"}
+    for e in entities:
+        expected = "администрация" if e.label == "INST" else "развитие культуры"
+        assert e.text.lower().replace("ё", "е") == expected
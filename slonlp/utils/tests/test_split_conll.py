@@ -0,0 +1,71 @@
+import json
+from pathlib import Path
+
+from slonlp.utils.split_conll import split_conll, count_labels, iterate_documents
+
+
+def make_document(name, labels):
+    lines = ["\t".join(("-DOCSTART-", name, "-X-", "-X-")), ""]
+    lines.extend(f"w{i}\t{label}\t0\t0" for i, label in enumerate(labels))
+    lines.append("")
+    return [s + "\n" for s in lines]
+
+
+def test_count_labels():
+    lines = make_document("doc", ["I-LOC", "I-LOC", "B-LOC", "O", "I-PER", "I-ORG"])
+    assert count_labels(lines) == {"LOC": 2, "PER": 1, "ORG": 1}
+
+
+def test_split_conll(tmpdir):
+    src_path = Path(tmpdir) / "corpus.txt"
+    docs = [
+        make_document(f"doc{i}", ["I-PER", "O"] if i % 10 else ["I-LOC", "I-PER"])
+        for i in range(100)
+    ]
+    src_path.open("wt").writelines(s for doc in docs for s in doc)
+
+    manifest = split_conll(src_path, Path(tmpdir), (0.8, 0.1, 0.1))
+
+    splits = manifest["splits"]
+    assert [len(splits[n]["documents"]) for n in ("train", "dev", "test")] == [
+        80,
+        10,
+        10,
+    ]
+    assert [splits[n]["label_counts"]["LOC"] for n in ("train", "dev", "test")] == [
+        8,
+        1,
+        1,
+    ]
+    assert json.load((Path(tmpdir) / "manifest.json").open()) == manifest
+    for name, split in splits.items():
+        with Path(split["path"]).open() as file:
+            names = [doc_name for doc_name, _ in iterate_documents(file)]
+        assert names == split["documents"]
+
+
+def test_split_conll_sizes(tmpdir):
+    src_path = Path(tmpdir) / "corpus.txt"
+    docs = [make_document(f"doc{i}", ["O"] * (1 + i % 7 * 10)) for i in range(200)]
+    docs += [make_document(f"ent{i}", ["I-LOC", "O"]) for i in range(20)]
+    src_path.open("wt").writelines(s for doc in docs for s in doc)
+    total = sum(len(doc) for doc in docs)
+
+    manifest = split_conll(src_path, Path(tmpdir), (0.9, 0, 0.1))
+
+    splits = manifest["splits"]
+    assert splits["dev"]["documents"] == []
+    for name, ratio in (("train", 0.9), ("test", 0.1)):
+        assert abs(splits[name]["line_count"] / total - ratio) < 0.02
+    assert splits["test"]["label_counts"]["LOC"] == 2
+
+
+def test_split_conll_new_dir(tmpdir):
+    src_path = Path(tmpdir) / "corpus.txt"
+    src_path.open("wt").writelines(["-DOCSTART- docA\n", "\n", "w\tI-LOC\t0\t1\n"])
+    output_dir = Path(tmpdir) / "splits" / "v1"
+
+    manifest = split_conll(src_path, output_dir)
+
+    assert manifest["splits"]["train"]["documents"] == ["docA"]
+    assert (output_dir / "manifest.json").exists()